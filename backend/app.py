@@ -1,6 +1,6 @@
 import streamlit as st
 import pandas as pd
-from main import *
+import main
 
 # Page configuration
 st.set_page_config(
@@ -36,9 +36,29 @@ This application analyzes CVs in PDF format and compares them with job descripti
 Based on the match, it automatically sends either a congratulations or rejection email to the applicant.
 """)
 
+@st.cache_resource
+def get_backend():
+    """Warm up the Groq client once per server process, not on every rerun."""
+    main._build_llm(main.MODEL_NAME)
+    return main
+
+backend = get_backend()
+
+# Status messages shown for each stage reported by process_application
+PROGRESS_LABELS = {
+    "pdf_loaded": "📄 CV parsed",
+    "match_analyzed": "🔍 Match analyzed",
+    "email_queued": "📧 Email queued",
+}
+
+# Columns of the results table in the View Results tab
+RESULT_COLUMNS = ["Applicant", "Job Title", "Match %", "Decision", "Email Status"]
+
 # Initialize session states
-if 'application_data' not in st.session_state:
-    st.session_state.application_data = []
+# Starts as None and is built from the first row, so pandas infers real column
+# dtypes instead of concatenating onto an empty, all-object frame
+if 'application_df' not in st.session_state:
+    st.session_state.application_df = None
 
 # Main tabs
 tab1, tab2 = st.tabs(["📤 Upload Files", "📊 View Results"])
@@ -62,66 +82,78 @@ with tab1:
         if not all([cv_file, job_description, applicant_email]):
             st.error("Please fill all required fields")
         else:
-            with st.spinner("Processing..."):
-                result = process_application(
+            with st.status("Processing...", expanded=True) as status:
+                progress_bar = st.progress(0)
+
+                def show_progress(stage, pct):
+                    status.write(PROGRESS_LABELS.get(stage, stage))
+                    progress_bar.progress(pct)
+
+                result = backend.process_application(
                     cv_file, applicant_name, applicant_email, 
-                    job_title, job_description, match_threshold
-                )                
-                if result["success"]:
-                    st.session_state.application_data.append(result)
-                    
-                    # Display results
-                    st.success("✅ Analysis complete!")
-                    
-                    # Generate email preview content
-                    is_accepted = result["recommendation"] == "Accept"
-                    email_subject, email_body = email_content(applicant_name, job_title, is_accepted)
-                    
-                    # Format email body for HTML display (replace newlines with <br>)
-                    formatted_email = email_body.replace("\n", "<br>")
-                    
-                    # Show email preview
-                    if is_accepted:
-                        st.markdown(f"""
-                        <div class="email-preview accept-email">
-                            <h3>🎉 Acceptance Email Preview (Sent to {applicant_email})</h3>
-                            <p><strong>Subject:</strong> {email_subject}</p>
-                            <hr>
-                            <p>{formatted_email}</p>
-                        </div>
-                        """, unsafe_allow_html=True)
-                        st.balloons()
-                    else:
-                        st.markdown(f"""
-                        <div class="email-preview reject-email">
-                            <h3>😞 Rejection Email Preview (Sent to {applicant_email})</h3>
-                            <p><strong>Subject:</strong> {email_subject}</p>
-                            <hr>
-                            <p>{formatted_email}</p>
-                        </div>
-                        """, unsafe_allow_html=True)
+                    job_title, job_description, match_threshold,
+                    on_progress=show_progress
+                )
+                status.update(label="Processing complete", state="complete" if result["success"] else "error",
+                              expanded=False)
+            if result["success"]:
+                row = pd.DataFrame([[
+                    result["applicant_name"],
+                    result["job_title"],
+                    result["match_percentage"],
+                    result["recommendation"],
+                    "✅ Queued" if result["email_sent"] else "❌ Failed"
+                ]], columns=RESULT_COLUMNS)
+                if st.session_state.application_df is None:
+                    st.session_state.application_df = row
+                else:
+                    st.session_state.application_df = pd.concat(
+                        [st.session_state.application_df, row], ignore_index=True
+                    )
+                
+                # Display results
+                st.success("✅ Analysis complete!")
+                
+                # Generate email preview content
+                is_accepted = result["recommendation"] == "Accept"
+                email_subject, email_body = backend.email_content(applicant_name, job_title, is_accepted)
+                
+                # Format email body for HTML display (replace newlines with <br>)
+                formatted_email = email_body.replace("\n", "<br>")
+                
+                # Show email preview
+                if is_accepted:
+                    st.markdown(f"""
+                    <div class="email-preview accept-email">
+                        <h3>🎉 Acceptance Email Preview (Sent to {applicant_email})</h3>
+                        <p><strong>Subject:</strong> {email_subject}</p>
+                        <hr>
+                        <p>{formatted_email}</p>
+                    </div>
+                    """, unsafe_allow_html=True)
+                    st.balloons()
+                else:
+                    st.markdown(f"""
+                    <div class="email-preview reject-email">
+                        <h3>😞 Rejection Email Preview (Sent to {applicant_email})</h3>
+                        <p><strong>Subject:</strong> {email_subject}</p>
+                        <hr>
+                        <p>{formatted_email}</p>
+                    </div>
+                    """, unsafe_allow_html=True)
 
 with tab2:
     st.header("Application Results")
     
-    if not st.session_state.application_data:
+    if st.session_state.application_df is None:
         st.info("No applications processed yet")
     else:
-        # Create dataframe
-        df = pd.DataFrame({
-            "Applicant": [app["applicant_name"] for app in st.session_state.application_data],
-            "Job Title": [app["job_title"] for app in st.session_state.application_data],
-            "Match %": [app["match_percentage"] for app in st.session_state.application_data],
-            "Decision": [app["recommendation"] for app in st.session_state.application_data],
-            "Email Status": ["✅ Sent" if app["email_sent"] else "❌ Failed" for app in st.session_state.application_data]
-        })
-        
         # Display with conditional formatting
         def color_decision(val):
             color = '#4CAF50' if val == "Accept" else '#f44336'
             return f'background-color: {color}; color: white'
         
         st.dataframe(
-            df.style.applymap(color_decision, subset=["Decision"]),
+            st.session_state.application_df.style.map(color_decision, subset=["Decision"]),
             use_container_width=True
         )
\ No newline at end of file
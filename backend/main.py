@@ -1,133 +1,530 @@
 from langchain_groq import ChatGroq
-from langchain.prompts import PromptTemplate
-from langchain.chains.llm import LLMChain
+from langchain_core.prompts import PromptTemplate
+from langchain_core.output_parsers import StrOutputParser
 from dotenv import load_dotenv
 import os
 import re
+import json
+import hashlib
 import tempfile
+import atexit
+import logging
+import queue
+import functools
+import threading
+import multiprocessing
+from collections import Counter, OrderedDict
 import smtplib
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from pypdf import PdfReader
-import streamlit as st
-import pandas as pd
+from pdf_worker import extract_page_range
 
 # Load environment variables from .env file
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 GROQ_API_KEY = os.getenv('GROQ_API_KEY')
 EMAIL_SENDER = os.getenv('EMAIL_SENDER')
 EMAIL_PASSWORD = os.getenv('EMAIL_PASSWORD')
 SMTP_SERVER = os.getenv('SMTP_SERVER', 'localhost')  # Default to localhost for local testing
 SMTP_PORT = int(os.getenv('SMTP_PORT', 1025))  # Default port for local testing
+SMTP_TIMEOUT = float(os.getenv('SMTP_TIMEOUT', 10))  # Seconds before a stalled SMTP operation fails
+MAIL_DRAIN_TIMEOUT = float(os.getenv('MAIL_DRAIN_TIMEOUT', 30))  # Seconds to flush queued emails at exit
+CACHE_DIR = Path(os.getenv('CACHE_DIR', '.cache'))  # On-disk cache for extracted text and analyses
+PDF_PARALLEL_MIN_PAGES = int(os.getenv('PDF_PARALLEL_MIN_PAGES', 100))  # Extract in parallel from this many pages
+PDF_MAX_WORKERS = min(8, os.cpu_count() or 1)
 
-def pdf_loader(pdf_file):
-    """Extract text from PDF file."""
-    temp_dir = tempfile.TemporaryDirectory()
-    tempfile_path = os.path.join(temp_dir.name, pdf_file.name)
-    with open(tempfile_path, 'wb') as f:
-        f.write(pdf_file.getbuffer())
-        pdf_reader = PdfReader(tempfile_path)
-        text = ''
-        for page in pdf_reader.pages:
-            text += page.extract_text()
-    
-    temp_dir.cleanup()
-    return text
+MODEL_NAME = os.getenv('MODEL_NAME', 'llama-3.1-8b-instant')  # Fast default model
+ESCALATION_MODEL_NAME = os.getenv('ESCALATION_MODEL_NAME', 'llama-3.3-70b-versatile')  # Empty to disable
+ESCALATION_BAND = int(os.getenv('ESCALATION_BAND', 10))  # Re-ask when this close to the threshold
+FAST_PATH_ACCEPT_OVERLAP = float(os.getenv('FAST_PATH_ACCEPT_OVERLAP', 0.75))  # ACCEPT above this coverage
+FAST_PATH_MAX_CV_CHARS = int(os.getenv('FAST_PATH_MAX_CV_CHARS', 1000))  # Only short CVs skip the LLM
+FAST_PATH_MIN_JOB_TERMS = int(os.getenv('FAST_PATH_MIN_JOB_TERMS', 5))  # Too few terms to judge by keywords
 
-def analyz_match(cv_text, job_description):
-    """Analyze match between CV and job description."""
-    template = """
+# The CV comes last so every applicant to a job shares the longest possible
+# prompt prefix, which lets the provider's prompt cache skip re-processing it
+MATCH_TEMPLATE = """
     You are an expert in HR system analyzing job applications.
     TASK: Compare the CV content with the job description and determine if there's a good match.
 
-    CV CONTENT:
-    {cv_text}
-
-    JOB DESCRIPTION:
-    {job_description}
-
     Evaluate the match by identifying key skills, qualifications, and experience from the job description,
     and determining if they appear in the CV. Calculate an overall match percentage.
 
     Output your analysis in the following format:
     - Match Percentage: [percentage]
+    - Recommendation: [ACCEPT or REJECT]
     - Matching Skills: [comma-separated list] 
     - Missing Skills: [comma-separated list]
     - Strengths: [brief summary]
     - Gaps: [brief summary]
-    - Recommendation: [ACCEPT or REJECT]
+
+    JOB DESCRIPTION:
+    {job_description}
+
+    CV CONTENT:
+    {cv_text}
     """
-    
-    prompt = PromptTemplate(template=template,
-                          input_variables=['cv_text', 'job_description'])
-    llm = ChatGroq(
-        model_name="llama3-8b-8192",
+
+# Patterns used to parse the LLM analysis, compiled once at import
+_MATCH_PCT_RE = re.compile(r'Match Percentage:?\s*(\d+)')
+_ALT_PCT_RES = [
+    re.compile(r'Match Percentage:?\s*(\d+)%', re.IGNORECASE),  # With percent sign
+    re.compile(r'Match Percentage.*?(\d+)', re.IGNORECASE),     # Any text between
+    re.compile(r'match.*?(\d+)%', re.IGNORECASE)                # Lowercase with percent
+]
+# Covers "Recommendation: ACCEPT", "Recommendation - Reject" and similar variants;
+# stays on the Recommendation line and needs whole words, so "acceptance" elsewhere
+# in the analysis is never read as a verdict
+_RECOMMENDATION_RE = re.compile(r'Recommendation[^\n]*?\b(ACCEPT|REJECT)\b', re.IGNORECASE)
+_ACCEPT_RE = re.compile(r'\baccept\b', re.IGNORECASE)
+
+# Analysis produced by the keyword fast path, in the same format as the LLM's
+_FAST_PATH_TEMPLATE = """
+- Match Percentage: {match_percentage}
+- Recommendation: {recommendation}
+- Matching Skills: {matching_skills}
+- Missing Skills: {missing_skills}
+- Strengths: Decided by keyword overlap without LLM review.
+- Gaps: Decided by keyword overlap without LLM review.
+"""
+
+# Tokenizer for skill terms; keeps symbols used in names like C++, C# and Node.js
+_TERM_RE = re.compile(r'[a-z0-9][a-z0-9+#.]*')
+_STOPWORDS = frozenset("""
+a about above after all also an and any are as at be been being both but by can could
+do does for from has have having he her his i if in into is it its may more most must
+not of on or our out over own per she should so such than that the their them then there
+these they this those through to under up us very was we were what when where which while
+who will with within would you your
+""".split())
+
+# Patterns and tables used to tidy extracted CV text before prompting
+_LIGATURES = str.maketrans({
+    '\ufb00': 'ff', '\ufb01': 'fi', '\ufb02': 'fl', '\ufb03': 'ffi',
+    '\ufb04': 'ffl', '\ufb05': 'st', '\ufb06': 'st',
+    '\u00a0': ' ', '\u00ad': ''
+})
+_INLINE_SPACE_RE = re.compile(r'[ \t\f\v]+')
+_BLANK_LINES_RE = re.compile(r'\n{3,}')
+_DIGITS_RE = re.compile(r'\d+')
+# Page-number lines once digits are masked: "#", "Page #", "Page # of #", "#/#", "- # -"
+_PAGE_NUMBER_RE = re.compile(r'(page\s*)?#(\s*(of|/)\s*#)?|-\s*#\s*-', re.IGNORECASE)
+HEADER_FOOTER_LINES = 2  # Lines at the top and bottom of each page checked for headers/footers
+
+class LRUCache:
+    """Thread-safe mapping that keeps at most maxsize of its most recently used entries."""
+
+    def __init__(self, maxsize):
+        self._maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the value for key, or None on a miss."""
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if len(self._data) > self._maxsize:
+                self._data.popitem(last=False)
+
+def _write_atomic(path, text):
+    """Write text to path so that concurrent readers never see a partial file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f'.{path.name}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+# In-process LRU cache of extracted CV text, keyed by SHA-256 of the PDF bytes
+PDF_CACHE_SIZE = 256
+# Part of the on-disk cache path; bump it whenever the extracted text changes shape
+PDF_CACHE_VERSION = 'v2'
+_pdf_text_cache = LRUCache(PDF_CACHE_SIZE)
+
+# Worker processes for long PDFs, started on first use and kept for the life
+# of the server. They are spawned rather than forked: this process already runs
+# Streamlit's and our own background threads, and forking with threads can deadlock
+_pdf_pool = None
+_pdf_pool_lock = threading.Lock()
+
+def _get_pdf_pool():
+    """Return the shared PDF worker pool, creating it if needed."""
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is None:
+            _pdf_pool = ProcessPoolExecutor(max_workers=PDF_MAX_WORKERS,
+                                            mp_context=multiprocessing.get_context('spawn'))
+        return _pdf_pool
+
+def _reset_pdf_pool(pool):
+    """Drop a broken worker pool so the next long PDF starts a fresh one."""
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is pool:
+            _pdf_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def _extract_text(pdf_file, buffer):
+    """Extract text from an in-memory PDF, splitting long documents across processes.
+
+    Pages are separated by form feeds so later cleanup can tell them apart.
+    """
+    # Read the upload stream in place, so the PDF bytes are not copied in-process
+    pdf_file.seek(0)
+    pdf_reader = PdfReader(pdf_file)
+    page_count = len(pdf_reader.pages)
+    workers = min(PDF_MAX_WORKERS, page_count)
+
+    if page_count < PDF_PARALLEL_MIN_PAGES or workers < 2:
+        return '\f'.join(page.extract_text() or '' for page in pdf_reader.pages)
+
+    # pypdf is pure Python and holds the GIL, so use processes rather than threads;
+    # each worker opens its own reader over a contiguous range of pages. The PDF is
+    # written to disk once and workers get its path, so the bytes are not pickled
+    # and held in memory once per task
+    chunk = -(-page_count // workers)
+    starts = range(0, page_count, chunk)
+    stops = [min(start + chunk, page_count) for start in starts]
+    fd, tmp_path = tempfile.mkstemp(suffix='.pdf')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(buffer)
+        pool = _get_pdf_pool()
+        try:
+            parts = list(pool.map(extract_page_range, [tmp_path] * len(starts), starts, stops))
+        except BrokenProcessPool:
+            logger.warning('PDF worker pool broke; extracting in-process instead')
+            _reset_pdf_pool(pool)
+            return '\f'.join(page.extract_text() or '' for page in pdf_reader.pages)
+    finally:
+        os.unlink(tmp_path)
+    return '\f'.join(text for part in parts for text in part)
+
+def pdf_loader(pdf_file):
+    """Extract text from PDF file, reusing the cached text for identical uploads."""
+    # getbuffer() is a zero-copy view of the upload; release it once done
+    with pdf_file.getbuffer() as buffer:
+        digest = hashlib.sha256(buffer).hexdigest()
+
+        # Check the in-process cache first, then the on-disk cache
+        text = _pdf_text_cache.get(digest)
+        if text is not None:
+            return text
+
+        cache_path = CACHE_DIR / 'pdf' / PDF_CACHE_VERSION / f'{digest}.txt'
+        if cache_path.exists():
+            text = cache_path.read_text(encoding='utf-8')
+            _pdf_text_cache.put(digest, text)
+            return text
+
+        text = _extract_text(pdf_file, buffer)
+
+    _write_atomic(cache_path, text)
+    _pdf_text_cache.put(digest, text)
+    return text
+
+def _page_edges(lines):
+    """Return the indexes of the first and last few non-empty lines of a page."""
+    filled = [i for i, line in enumerate(lines) if line]
+    return set(filled[:HEADER_FOOTER_LINES] + filled[-HEADER_FOOTER_LINES:])
+
+def _edge_key(line):
+    """Return the key a header/footer line is compared by across pages.
+
+    Page numbers match with their digits masked; any other line, such as a
+    date range, must recur exactly.
+    """
+    masked = _DIGITS_RE.sub('#', line)
+    return masked if _PAGE_NUMBER_RE.fullmatch(masked) else line
+
+def clean_cv_text(text):
+    """Tidy extracted CV text to cut the tokens sent to the LLM.
+
+    Normalizes ligatures and collapses runs of whitespace. Lines at the top or
+    bottom of a page that recur there on most pages, such as running headers
+    and "Page 2 of 3" footers, are kept only where they first appear.
+    """
+    text = text.translate(_LIGATURES)
+    pages = [[_INLINE_SPACE_RE.sub(' ', line).strip() for line in page.splitlines()]
+             for page in text.split('\f')]
+    edges = [_page_edges(lines) for lines in pages]
+
+    # Compare edge lines across pages, counting each page once
+    counts = Counter()
+    for lines, page_edges in zip(pages, edges):
+        counts.update({_edge_key(lines[i]) for i in page_edges})
+    repeated = {key for key, count in counts.items() if count >= 2 and count > len(pages) / 2}
+
+    seen = set()
+    kept = []
+    for lines, page_edges in zip(pages, edges):
+        for i, line in enumerate(lines):
+            key = _edge_key(line) if i in page_edges else None
+            if key in repeated:
+                if key in seen:
+                    continue
+                seen.add(key)
+            kept.append(line)
+
+    return _BLANK_LINES_RE.sub('\n\n', '\n'.join(kept)).strip()
+
+@functools.lru_cache(maxsize=None)
+def _build_llm(model_name):
+    """Build the Groq client once per model and reuse its HTTP connections."""
+    return ChatGroq(
+        model_name=model_name,
         temperature=0,
         api_key=GROQ_API_KEY
     )
 
-    chain = LLMChain(llm=llm, prompt=prompt)
-    response = chain.invoke({
-        'cv_text': cv_text,
-        'job_description': job_description
-    })
-    
-    # Handle the response based on its structure
-    response_text = ""
-    if isinstance(response, dict) and 'text' in response:
-        response_text = response['text'] 
-    elif isinstance(response, str):
-        response_text = response
+@functools.lru_cache(maxsize=64)
+def _job_prompt(job_description):
+    """Return the match prompt with the job description already filled in.
+
+    Only {cv_text} is left to substitute per applicant. Braces in the job
+    description are escaped so they are not read as template variables.
+    """
+    escaped = job_description.replace('{', '{{').replace('}', '}}')
+    return PromptTemplate(template=MATCH_TEMPLATE.replace('{job_description}', escaped),
+                          input_variables=['cv_text'])
+
+@functools.lru_cache(maxsize=64)
+def _build_chain(model_name, job_description):
+    """Build the analysis chain for one model and job description.
+
+    The chain ends in StrOutputParser, so invoke and stream both yield str.
+    """
+    return _job_prompt(job_description) | _build_llm(model_name) | StrOutputParser()
+
+# In-process LRU cache of raw analyses, backed by .cache/llm on disk
+ANALYSIS_CACHE_SIZE = 1024
+_analysis_cache = LRUCache(ANALYSIS_CACHE_SIZE)
+
+def _analysis_cache_key(model_name, cv_text, job_description):
+    """Build a cache key covering everything that affects the LLM output."""
+    digest = hashlib.sha256()
+    for part in (model_name, MATCH_TEMPLATE, cv_text, job_description):
+        digest.update(hashlib.sha256(part.encode('utf-8')).digest())
+    return digest.hexdigest()
+
+def _load_cached_response(key):
+    """Return a cached analysis from memory or disk, or None on a miss."""
+    response_text = _analysis_cache.get(key)
+    if response_text is not None:
+        return response_text
+
+    cache_path = CACHE_DIR / 'llm' / f'{key}.json'
+    try:
+        response_text = json.loads(cache_path.read_text(encoding='utf-8'))['text']
+    except FileNotFoundError:
+        return None
+    except (ValueError, KeyError, TypeError):
+        # An unreadable entry is treated as a miss and overwritten by the next store
+        logger.warning('Ignoring corrupt analysis cache file %s', cache_path)
+        return None
+    _analysis_cache.put(key, response_text)
+    return response_text
+
+def _stream_response(chain, inputs, on_decision):
+    """Stream an analysis, calling on_decision as soon as its verdict has been decoded.
+
+    Returns (response_text, complete). If the stream fails after the verdict was
+    reported, the text decoded so far is returned with complete=False, so the
+    decision already acted on stands; failures before that point are raised.
+    """
+    parts = []
+    decided = False
+    try:
+        for chunk in chain.stream(inputs):
+            parts.append(chunk)
+            if decided:
+                continue
+
+            buffer = ''.join(parts)
+            match = _MATCH_PCT_RE.search(buffer)
+            rec_match = _RECOMMENDATION_RE.search(buffer)
+            # Wait for a character after each value so "85" isn't read as "8"
+            # or a cut-off word as the verdict
+            if (match and rec_match and match.end() < len(buffer)
+                    and rec_match.end() < len(buffer)):
+                decided = True
+                on_decision(int(match.group(1)), rec_match.group(1).upper())
+    except Exception:
+        if not decided:
+            raise
+        logger.warning('Analysis stream failed after its verdict was decoded', exc_info=True)
+        return ''.join(parts), False
+    return ''.join(parts), True
+
+def _llm_response(model_name, cv_text, job_description, on_decision=None):
+    """Return the raw LLM analysis, reusing cached output for repeat (CV, job) pairs.
+
+    With on_decision, the analysis is streamed rather than invoked, and
+    on_decision(match_percentage, recommendation) may be called before it ends.
+    """
+    key = _analysis_cache_key(model_name, cv_text, job_description)
+    response_text = _load_cached_response(key)
+    if response_text is not None:
+        return response_text
+
+    chain = _build_chain(model_name, job_description)
+    inputs = {'cv_text': cv_text}
+    complete = True
+    if on_decision is not None:
+        response_text, complete = _stream_response(chain, inputs, on_decision)
     else:
-        # Try to convert to string if it's another type
-        response_text = str(response)
-    
+        response_text = chain.invoke(inputs)
+
+    # A stream cut short after its verdict is used for this request but not cached
+    if response_text and complete:
+        _analysis_cache.put(key, response_text)
+        _write_atomic(CACHE_DIR / 'llm' / f'{key}.json', json.dumps({'text': response_text}))
+    return response_text
+
+def _parse_analysis(response_text):
+    """Extract the match percentage and recommendation from an analysis."""
     # Extracts Match Percentage
-    match_percentage_pattern = r'Match Percentage:?\s*(\d+)'
-    match = re.search(match_percentage_pattern, response_text)
+    match = _MATCH_PCT_RE.search(response_text)
     match_percentage = 0
     
     if match:
         match_percentage = int(match.group(1))
     else:
         # Try alternative patterns
-        alt_patterns = [
-            r'Match Percentage:?\s*(\d+)%',  # With percent sign
-            r'Match Percentage.*?(\d+)',     # Any text between
-            r'match.*?(\d+)%'                # Lowercase with percent
-        ]
-        
-        for pattern in alt_patterns:
-            alt_match = re.search(pattern, response_text, re.IGNORECASE)
+        for pattern in _ALT_PCT_RES:
+            alt_match = pattern.search(response_text)
             if alt_match:
                 match_percentage = int(alt_match.group(1))
                 break
     
     # Extracts Recommendation
-    recommendation_patterns = [
-        r'Recommendation:?\s*(ACCEPT|REJECT)',
-        r'Recommendation:?\s*(Accept|Reject)',
-        r'Recommendation.*?(ACCEPT|REJECT)',
-        r'Recommendation.*?(Accept|Reject)'
-    ]
-    
     recommendation = None
-    
-    for pattern in recommendation_patterns:
-        rec_match = re.search(pattern, response_text, re.IGNORECASE)
-        if rec_match:
-            recommendation = rec_match.group(1).upper()
-            break
+    rec_match = _RECOMMENDATION_RE.search(response_text)
+    if rec_match:
+        recommendation = rec_match.group(1).upper()
     
     # Default to REJECT if no recommendation found
     if recommendation is None:
         # Check if the text contains "accept" anywhere as fallback
-        if re.search(r'\baccept\b', response_text, re.IGNORECASE):
+        if _ACCEPT_RE.search(response_text):
             recommendation = "ACCEPT"
         else:
             recommendation = "REJECT"
     
+    return match_percentage, recommendation
+
+def _skill_tokens(text):
+    """Return the lower-cased words of text in order, minus stopwords."""
+    words = (word.rstrip('.') for word in _TERM_RE.findall(text.lower()))
+    return [word for word in words if word and word not in _STOPWORDS]
+
+def _skill_terms(text):
+    """Return the set of lower-cased words in text, minus stopwords."""
+    return set(_skill_tokens(text))
+
+@functools.lru_cache(maxsize=64)
+def _job_tokens(job_description):
+    """Return the skill tokens of a job description, computed once per job."""
+    return tuple(_skill_tokens(job_description))
+
+def _fast_path_match(cv_text, job_description, match_threshold=None):
+    """Accept short CVs that clearly match on keywords alone, without calling the LLM.
+
+    Returns (analysis_text, match_percentage, "ACCEPT") when a CV of at most
+    FAST_PATH_MAX_CV_CHARS covers more than FAST_PATH_ACCEPT_OVERLAP of the job's
+    skill tokens and, if given, scores at least match_threshold, else None.
+    Coverage is counted per token, so skills the job description repeats weigh
+    more than ones it mentions in passing. Rejections always go to the LLM,
+    since keyword overlap misses skills the CV words differently from the job
+    description.
+    """
+    if len(cv_text) > FAST_PATH_MAX_CV_CHARS:
+        return None
+
+    jd_tokens = _job_tokens(job_description)
+    jd_terms = set(jd_tokens)
+    if len(jd_terms) < FAST_PATH_MIN_JOB_TERMS:
+        return None
+
+    cv_terms = _skill_terms(cv_text)
+    matching = jd_terms & cv_terms
+    overlap = sum(token in cv_terms for token in jd_tokens) / len(jd_tokens)
+    if overlap <= FAST_PATH_ACCEPT_OVERLAP:
+        return None
+
+    match_percentage = round(overlap * 100)
+    if match_threshold is not None and match_percentage < match_threshold:
+        return None
+
+    analysis_text = _FAST_PATH_TEMPLATE.format(
+        match_percentage=match_percentage,
+        matching_skills=', '.join(sorted(matching)),
+        missing_skills=', '.join(sorted(jd_terms - cv_terms)) or 'None',
+        recommendation="ACCEPT"
+    )
+    return analysis_text, match_percentage, "ACCEPT"
+
+def analyz_match(cv_text, job_description, match_threshold=None, on_decision=None):
+    """Analyze match between CV and job description.
+
+    Short CVs that clearly match are accepted by keyword overlap. Otherwise the
+    default model is asked, and if match_threshold is given and its score lands
+    within ESCALATION_BAND of it, the answer is taken from the escalation model.
+
+    If given, on_decision(match_percentage, recommendation) is called once with
+    the final verdict, as soon as it is known and possibly while the rest of
+    the analysis is still streaming.
+    """
+    fast_result = _fast_path_match(cv_text, job_description, match_threshold)
+    if fast_result is not None:
+        if on_decision is not None:
+            on_decision(fast_result[1], fast_result[2])
+        return fast_result
+
+    def needs_escalation(match_percentage):
+        return (match_threshold is not None and bool(ESCALATION_MODEL_NAME)
+                and abs(match_percentage - match_threshold) <= ESCALATION_BAND)
+
+    decided = False
+
+    def decide(match_percentage, recommendation):
+        nonlocal decided
+        decided = True
+        on_decision(match_percentage, recommendation)
+
+    def decide_unless_escalating(match_percentage, recommendation):
+        if not needs_escalation(match_percentage):
+            decide(match_percentage, recommendation)
+
+    response_text = _llm_response(MODEL_NAME, cv_text, job_description,
+                                  decide_unless_escalating if on_decision else None)
+    match_percentage, recommendation = _parse_analysis(response_text)
+
+    if needs_escalation(match_percentage):
+        response_text = _llm_response(ESCALATION_MODEL_NAME, cv_text, job_description,
+                                      decide if on_decision else None)
+        match_percentage, recommendation = _parse_analysis(response_text)
+
+    # Cache hits and unparsable streams never reported a verdict along the way
+    if on_decision is not None and not decided and response_text:
+        decide(match_percentage, recommendation)
+    
     return (response_text, match_percentage, recommendation)
 
 def email_content(applicant_name, job_title, is_match):
@@ -165,6 +562,54 @@ Recruitment Team
     
     return email_subject, email_body
 
+# Shared SMTP connection, reused across emails; guarded by a lock because
+# Streamlit runs each session on its own thread
+_smtp_conn = None
+_smtp_lock = threading.Lock()
+
+def _connect_smtp():
+    """Open and authenticate a new SMTP connection."""
+    server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT, timeout=SMTP_TIMEOUT)
+    try:
+        server.ehlo()
+        server.starttls()
+        server.ehlo()
+
+        # Login only if credentials are provided
+        if EMAIL_SENDER and EMAIL_PASSWORD:
+            server.login(EMAIL_SENDER, EMAIL_PASSWORD)
+    except Exception:
+        server.close()
+        raise
+    return server
+
+def _close_smtp():
+    """Close the shared SMTP connection, if any."""
+    global _smtp_conn
+    if _smtp_conn is None:
+        return
+    try:
+        _smtp_conn.quit()
+    except (smtplib.SMTPException, OSError):
+        _smtp_conn.close()
+    _smtp_conn = None
+
+def _get_smtp():
+    """Return the shared SMTP connection, reconnecting if it has gone stale."""
+    global _smtp_conn
+    if _smtp_conn is not None:
+        try:
+            if _smtp_conn.noop()[0] == 250:
+                return _smtp_conn
+        except (smtplib.SMTPException, OSError):
+            pass
+        _close_smtp()
+
+    _smtp_conn = _connect_smtp()
+    return _smtp_conn
+
+atexit.register(_close_smtp)
+
 def send_email(recipient_email, subject, body):
     """Send an email to the recipient."""
     try:
@@ -177,29 +622,81 @@ def send_email(recipient_email, subject, body):
         # Attach body
         message.attach(MIMEText(body, 'plain'))
 
-        # Connect to server and send
-        with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
-            server.ehlo()
-            server.starttls()
-            server.ehlo()
-
-            # Login only if credentials are provided
-            if EMAIL_SENDER and EMAIL_PASSWORD:
-                server.login(EMAIL_SENDER, EMAIL_PASSWORD)
-
-            server.send_message(message)
+        # Send over the shared connection, retrying once if the server dropped it
+        with _smtp_lock:
+            try:
+                _get_smtp().send_message(message)
+            except smtplib.SMTPServerDisconnected:
+                _close_smtp()
+                _get_smtp().send_message(message)
         
         return True, 'Email sent successfully!'
     except Exception as e:
         return False, f'Failed to send email: {str(e)}'
 
-def process_application(cv_file, applicant_name, applicant_email, job_title, job_description, match_threshold=70):
-    """Process a job application by analyzing CV and sending appropriate email."""
+# Decision emails are queued and sent by a background worker so that
+# process_application can return without waiting on SMTP
+_mail_queue = queue.Queue()
+_mail_drained = threading.Event()
+
+def _mail_worker():
+    """Send queued (recipient, subject, body) emails over the shared connection."""
+    while True:
+        item = _mail_queue.get()
+        try:
+            # None is queued at shutdown, after every pending email
+            if item is None:
+                _mail_drained.set()
+                return
+            recipient_email, subject, body = item
+            success, message = send_email(recipient_email, subject, body)
+            if not success:
+                logger.warning('%s (to %s)', message, recipient_email)
+        finally:
+            _mail_queue.task_done()
+
+def _drain_mail_queue():
+    """Give queued emails up to MAIL_DRAIN_TIMEOUT seconds to go out at shutdown."""
+    _mail_queue.put(None)
+    if not _mail_drained.wait(MAIL_DRAIN_TIMEOUT):
+        logger.warning('Shutting down with %d queued emails unsent', _mail_queue.qsize())
+
+threading.Thread(target=_mail_worker, name='mail-worker', daemon=True).start()
+# Registered after _close_smtp so it runs first: drain the queue, then disconnect
+atexit.register(_drain_mail_queue)
+
+def process_application(cv_file, applicant_name, applicant_email, job_title, job_description, match_threshold=70,
+                        on_progress=None):
+    """Process a job application by analyzing CV and sending appropriate email.
+
+    If given, on_progress(stage, pct) is called as each stage completes so the
+    caller can report progress while the remaining stages run.
+    """
+    def report(stage, pct):
+        if on_progress is not None:
+            on_progress(stage, pct)
+
     # Extract text from CV
-    cv_text = pdf_loader(cv_file)
+    cv_text = clean_cv_text(pdf_loader(cv_file))
+    report('pdf_loaded', 33)
     
-    # Analyze match
-    analysis_text, match_percentage, recommendation = analyz_match(cv_text, job_description)
+    # Analyze match, queueing the email as soon as the verdict is known
+    email_job = {}
+
+    def send_decision_email(match_percentage, recommendation):
+        # Determine if the CV matches the job requirements
+        # Use BOTH the match percentage AND recommendation for the final decision
+        is_match = (match_percentage >= match_threshold or recommendation == "ACCEPT")
+        
+        # Generate email content based on match status
+        email_subject, email_body = email_content(applicant_name, job_title, is_match)
+        email_job['is_match'] = is_match
+        _mail_queue.put((applicant_email, email_subject, email_body))
+
+    analysis_text, match_percentage, recommendation = analyz_match(
+        cv_text, job_description, match_threshold, on_decision=send_decision_email
+    )
+    report('match_analyzed', 66)
 
     if not analysis_text:
         return {
@@ -207,15 +704,9 @@ def process_application(cv_file, applicant_name, applicant_email, job_title, job
             'message': 'Failed to analyze the CV.'
         }
 
-    # Determine if the CV matches the job requirements
-    # Use BOTH the match percentage AND recommendation for the final decision
-    is_match = (match_percentage >= match_threshold or recommendation == "ACCEPT")
-    
-    # Generate email content based on match status
-    email_subject, email_body = email_content(applicant_name, job_title, is_match)
-    
-    # Send email
-    email_success, email_message = send_email(applicant_email, email_subject, email_body)
+    is_match = email_job['is_match']
+    email_success, email_message = True, 'Email queued for delivery.'
+    report('email_queued', 100)
 
     # Return results with the keys exactly matching what the frontend expects
     return {
@@ -0,0 +1,15 @@
+"""Page-range text extraction run inside the PDF worker processes.
+
+Kept apart from main.py so that spawned workers only import pypdf, not the
+LangChain and SMTP setup of the main module.
+"""
+from pypdf import PdfReader
+
+def extract_page_range(path, start, stop):
+    """Extract the text of pages [start, stop) from the PDF file at path."""
+    # Open the file ourselves: given a path, PdfReader reads the whole file into
+    # memory, while over an open file it only reads the objects it needs
+    with open(path, 'rb') as f:
+        pdf_reader = PdfReader(f)
+        # Image-only pages return None, so fall back to an empty string
+        return [pdf_reader.pages[i].extract_text() or '' for i in range(start, stop)]
@@ -0,0 +1,7 @@
+import os
+import sys
+import tempfile
+
+# The backend modules import each other as top-level modules, as Streamlit runs them
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+os.environ.setdefault('CACHE_DIR', tempfile.mkdtemp(prefix='cv-analyzer-cache-'))
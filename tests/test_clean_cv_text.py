@@ -0,0 +1,30 @@
+import main
+
+
+def test_running_header_and_page_footer_are_kept_once():
+    pages = [
+        f"Jane Doe - Curriculum Vitae\nExperience item {n}\nMore detail {n}\nPage {n} of 3"
+        for n in (1, 2, 3)
+    ]
+    cleaned = main.clean_cv_text('\f'.join(pages))
+    assert cleaned.splitlines() == [
+        "Jane Doe - Curriculum Vitae",
+        "Experience item 1", "More detail 1", "Page 1 of 3",
+        "Experience item 2", "More detail 2",
+        "Experience item 3", "More detail 3",
+    ]
+
+
+def test_date_lines_at_page_edges_are_kept():
+    pages = [
+        "2019 - 2021\nSenior engineer, Acme\nPython and Django",
+        "2015 - 2018\nEngineer, Initech\nJava services",
+        "2012 - 2015\nJunior engineer, Globex\nBody line python",
+    ]
+    cleaned = main.clean_cv_text('\f'.join(pages))
+    assert cleaned.splitlines() == '\n'.join(pages).splitlines()
+
+
+def test_numbered_body_lines_on_short_pages_are_kept():
+    pages = [f"Body line {n} python" for n in range(1, 10)]
+    assert main.clean_cv_text('\f'.join(pages)).splitlines() == pages
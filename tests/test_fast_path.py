@@ -0,0 +1,73 @@
+import main
+
+PROSE_JOB = (
+    "We are looking for a backend engineer to join our growing platform team. "
+    "You will design and maintain services written in Python using Django, "
+    "work closely with product managers, model data in PostgreSQL and deploy "
+    "to AWS. Experience mentoring colleagues and writing clear documentation "
+    "is a plus."
+)
+
+SKILLED_CV = (
+    "Backend developer, 6 years. Built REST services in Python and Django, "
+    "tuned PostgreSQL queries, ran deployments on AWS (ECS, RDS, S3)."
+)
+
+
+def test_skill_terms_are_single_words():
+    terms = main._skill_terms("Experience with C++, Node.js and Python.")
+    assert terms == {'experience', 'c++', 'node.js', 'python'}
+
+
+def test_fast_path_never_rejects():
+    assert main._fast_path_match("Line cook, pastry and grill station.", PROSE_JOB) is None
+
+
+def test_skilled_candidate_against_prose_job_goes_to_llm():
+    # Keyword coverage of a prose job post is low even for a strong CV, so it
+    # must not be decided without the LLM
+    assert main._fast_path_match(SKILLED_CV, PROSE_JOB) is None
+
+
+def test_short_job_description_goes_to_llm():
+    assert main._fast_path_match("Python developer", "Python developer") is None
+
+
+def test_long_cv_goes_to_llm():
+    job = "python django postgresql aws docker"
+    cv = job + " " + "x" * main.FAST_PATH_MAX_CV_CHARS
+    assert main._fast_path_match(cv, job) is None
+
+
+def test_short_cv_covering_job_terms_is_accepted():
+    job = "Python, Django, PostgreSQL, AWS and Docker"
+    analysis, match_percentage, recommendation = main._fast_path_match(
+        "Python and Django developer using PostgreSQL, Docker and AWS.", job
+    )
+    assert recommendation == "ACCEPT"
+    assert match_percentage == 100
+    assert main._parse_analysis(analysis) == (100, "ACCEPT")
+
+
+def test_coverage_weighs_repeated_job_tokens():
+    # Only 3 of the 5 distinct skills match, but Python makes up 5 of the
+    # job's 9 skill tokens, so token coverage is 7/9
+    job = "Python, Python, Python, Python, Python, Django, Docker, AWS, Go"
+    cv = "Python engineer shipping Django apps with Docker."
+    analysis, match_percentage, recommendation = main._fast_path_match(cv, job)
+    assert (match_percentage, recommendation) == (78, "ACCEPT")
+
+
+def test_coverage_at_threshold_goes_to_llm():
+    # 6 of the job's 8 tokens gives exactly 0.75, which is not above the threshold
+    job = "python django docker aws kubernetes terraform go rust"
+    cv = "python django docker aws kubernetes terraform"
+    assert main._fast_path_match(cv, job) is None
+
+
+def test_coverage_below_hr_threshold_goes_to_llm():
+    # 4 of 5 tokens clears FAST_PATH_ACCEPT_OVERLAP, but 80% is short of the HR's 95
+    job = "python django postgresql aws docker"
+    cv = "python django postgresql aws"
+    assert main._fast_path_match(cv, job) is not None
+    assert main._fast_path_match(cv, job, match_threshold=95) is None
@@ -0,0 +1,28 @@
+import main
+
+
+class FailingStreamChain:
+    """Stands in for the Groq chain: streams a verdict, then drops the connection."""
+
+    def stream(self, inputs):
+        yield "- Match Percentage: 40\n"
+        yield "- Recommendation: REJECT\n"
+        yield "- Matching Skills: "
+        raise ConnectionError("stream dropped")
+
+
+def test_stream_failure_after_verdict_keeps_the_decision(monkeypatch):
+    sent = []
+    monkeypatch.setattr(main, '_build_chain', lambda model_name, job_description: FailingStreamChain())
+    monkeypatch.setattr(main, 'pdf_loader', lambda cv_file: "Line cook with ten years on the grill.")
+    monkeypatch.setattr(main, 'send_email', lambda *args: (sent.append(args), (True, 'ok'))[1])
+
+    result = main.process_application(None, 'Ann', 'ann@example.com', 'Chef', 'Sous chef', 70)
+    main._mail_queue.join()
+
+    assert result['success']
+    assert result['recommendation'] == 'Reject'
+    assert result['match_percentage'] == 40
+    assert len(sent) == 1
+    key = main._analysis_cache_key(main.MODEL_NAME, "Line cook with ten years on the grill.", 'Sous chef')
+    assert main._load_cached_response(key) is None